@@ -210,7 +210,7 @@ class BaseAgent(ABC):
         log_data = {
             "agent": self.agent_name,
             "action": action.action_type.value,
-            "success": not response.metadata.get("error", False),
+            "success": not (response.metadata or {}).get("error", False),
             "response_format": response.response_format.value,
             "requires_clarification": response.requires_clarification,
             "execution_time": execution_time
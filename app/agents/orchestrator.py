@@ -2,7 +2,7 @@ from typing import Dict, List, Optional, Any, Tuple
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-import json
+import orjson
 import asyncio
 
 from app.core.config import BusinessConfig, ConversationType, BusinessType, settings
@@ -11,6 +11,15 @@ from app.models.schemas import (
     ActionType, ResponseFormat, ConversationMessage, MessageType
 )
 
+# Pretty-printed output for prompt context; OPT_NON_STR_KEYS handles
+# the ConversationType enum keys inside the business config dicts
+_ORJSON_PROMPT_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize prompt context to JSON via orjson"""
+    return orjson.dumps(obj, option=_ORJSON_PROMPT_OPTS).decode()
+
 
 class OrchestratorAgent:
     """
@@ -78,9 +87,9 @@ class OrchestratorAgent:
         prompt_input = {
             "message": message,
             "business_type": self.business_type.value,
-            "business_context": json.dumps(business_context, indent=2),
+            "business_context": _dumps(business_context),
             "conversation_history": conversation_history,
-            "current_context": json.dumps(state.context, indent=2)
+            "current_context": _dumps(state.context)
         }
         
         response = await self.llm.ainvoke(classification_prompt.format(**prompt_input))
@@ -100,7 +109,7 @@ class OrchestratorAgent:
             content = content.strip()
             
             print(f"🔍 [CLASSIFY_INTENT] Cleaned content: {content}")
-            intent_data = json.loads(content)
+            intent_data = orjson.loads(content)
             print(f"🔍 [CLASSIFY_INTENT] Parsed JSON: {intent_data}")
             
             # Handle case sensitivity by converting to lowercase
@@ -113,7 +122,7 @@ class OrchestratorAgent:
                 required_params=intent_data.get("required_params", []),
                 missing_params=intent_data.get("missing_params", [])
             )
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (orjson.JSONDecodeError, KeyError, ValueError) as e:
             # Fallback classification
             print(f"❌ [CLASSIFY_INTENT] JSON parsing failed: {e}")
             print(f"❌ [CLASSIFY_INTENT] Raw response was: {response.content}")
@@ -141,9 +150,9 @@ class OrchestratorAgent:
         
         prompt_input = {
             "user_intent": user_intent.dict(),
-            "conversation_flow": json.dumps(conversation_flow, indent=2),
-            "business_config": json.dumps(self.business_config.config, indent=2),
-            "current_context": json.dumps(state.context, indent=2),
+            "conversation_flow": _dumps(conversation_flow),
+            "business_config": _dumps(self.business_config.config),
+            "current_context": _dumps(state.context),
             "available_actions": [action.value for action in ActionType]
         }
         
@@ -162,7 +171,7 @@ class OrchestratorAgent:
             
             print(f"📝 [ACTION_PLANNING] Raw LLM response: {response.content}")
             print(f"📝 [ACTION_PLANNING] Cleaned content: {content}")
-            actions_data = json.loads(content)
+            actions_data = orjson.loads(content)
             print(f"📝 [ACTION_PLANNING] Parsed actions: {actions_data}")
             actions = []
             
@@ -180,7 +189,7 @@ class OrchestratorAgent:
             actions.sort(key=lambda x: x.priority, reverse=True)
             return actions
             
-        except (json.JSONDecodeError, KeyError) as e:
+        except (orjson.JSONDecodeError, KeyError) as e:
             # Fallback action using existing agent
             return [AgentAction(
                 action_type=ActionType.GENERAL_RESPONSE,
@@ -345,10 +354,10 @@ Plan the optimal actions to address this user intent:"""
         
         responses = []
         
-        # Execute actions in priority order
+        # Execute actions in priority order; single dict lookup per dispatch
         for action in actions:
-            if action.agent_name in self.specialized_agents:
-                agent = self.specialized_agents[action.agent_name]
+            agent = self.specialized_agents.get(action.agent_name)
+            if agent is not None:
                 try:
                     response = await agent.execute_action(action, conversation_state)
                     responses.append(response)
@@ -2,7 +2,7 @@ from typing import Dict, List, Optional, Any, TypedDict
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 import uuid
-import json
+import orjson
 from datetime import datetime
 
 from app.core.config import BusinessType, ConversationType
@@ -31,7 +31,13 @@ class MultiAgentWorkflow:
     Main LangGraph workflow that orchestrates the multi-agent customer service system.
     Handles the complete conversation flow from intent classification to response generation.
     """
-    
+
+    # The graph topology is identical for every business type, so the StateGraph
+    # is built once per process and shared; nodes dispatch to the right instance
+    # through the registry below (one instance per business type)
+    _graph_template: Optional[StateGraph] = None
+    _instances: Dict[BusinessType, "MultiAgentWorkflow"] = {}
+
     def __init__(self, business_type: BusinessType):
         self.business_type = business_type
         
@@ -56,48 +62,69 @@ class MultiAgentWorkflow:
             ConversationType.GENERAL_CONVERSATION: "product_discovery_agent",  # fallback
         }
         
-        # Initialize the workflow graph
-        self.workflow = self._create_workflow()
+        # Register this instance so the shared graph nodes can dispatch to it
+        MultiAgentWorkflow._instances[business_type] = self
+
+        # Initialize the workflow graph (shared template, built once per process)
+        self.workflow = self._get_graph_template()
         self.memory = MemorySaver()
-        
+
         # Compile the workflow
         self.app = self.workflow.compile(checkpointer=self.memory)
-    
-    def _create_workflow(self) -> StateGraph:
-        """Create the LangGraph workflow"""
-        
+
+    @classmethod
+    def _get_graph_template(cls) -> StateGraph:
+        """Get the shared StateGraph template, building it on first use"""
+        if cls._graph_template is None:
+            cls._graph_template = cls._create_workflow()
+        return cls._graph_template
+
+    @classmethod
+    def _dispatch_node(cls, method_name: str):
+        """Create a graph node that routes to the instance for the state's business type"""
+
+        async def node(state: WorkflowState) -> WorkflowState:
+            workflow = cls._instances[state["conversation_state"].business_type]
+            return await getattr(workflow, method_name)(state)
+
+        return node
+
+    @classmethod
+    def _create_workflow(cls) -> StateGraph:
+        """Create the LangGraph workflow (topology shared across business types)"""
+
         workflow = StateGraph(WorkflowState)
-        
+
         # Add nodes
-        workflow.add_node("classify_intent", self._classify_intent_node)
-        workflow.add_node("plan_actions", self._plan_actions_node)
-        workflow.add_node("execute_actions", self._execute_actions_node)
-        workflow.add_node("generate_response", self._generate_response_node)
-        workflow.add_node("handle_error", self._handle_error_node)
-        
+        workflow.add_node("classify_intent", cls._dispatch_node("_classify_intent_node"))
+        workflow.add_node("plan_actions", cls._dispatch_node("_plan_actions_node"))
+        workflow.add_node("execute_actions", cls._dispatch_node("_execute_actions_node"))
+        workflow.add_node("generate_response", cls._dispatch_node("_generate_response_node"))
+        workflow.add_node("handle_error", cls._dispatch_node("_handle_error_node"))
+
         # Define the workflow flow
         workflow.set_entry_point("classify_intent")
-        
+
         # From classify_intent
         workflow.add_edge("classify_intent", "plan_actions")
-        
+
         # From plan_actions
         workflow.add_edge("plan_actions", "execute_actions")
-        
+
         # From execute_actions - conditional routing
         workflow.add_conditional_edges(
             "execute_actions",
-            self._should_continue_or_respond,
+            cls._should_continue_or_respond,
             {
                 "generate_response": "generate_response",
                 "handle_error": "handle_error"
             }
         )
-        
+
         # Terminal nodes
         workflow.add_edge("generate_response", END)
         workflow.add_edge("handle_error", END)
-        
+
         return workflow
     
     async def process_message(self, chat_request: ChatRequest) -> ChatResponse:
@@ -108,7 +135,7 @@ class MultiAgentWorkflow:
             session_id=chat_request.session_id,
             user_id=chat_request.user_id,
             business_type=chat_request.business_type,
-            context=chat_request.context
+            context=chat_request.context or {}
         )
         
         # Add user message to conversation history
@@ -120,9 +147,7 @@ class MultiAgentWorkflow:
             timestamp=datetime.now()
         )
         
-        # Ensure conversation_history is a list and append message
-        if not hasattr(conversation_state, 'conversation_history') or conversation_state.conversation_history is None:
-            conversation_state.conversation_history = []
+        # conversation_history is always a list (schema default_factory)
         conversation_state.conversation_history.append(user_message)
         
         # Initialize workflow state
@@ -211,7 +236,7 @@ class MultiAgentWorkflow:
             
             for action in planned_actions:
                 # Create a unique identifier for this action (safe for lists/dicts)
-                params_str = json.dumps(action.parameters, sort_keys=True) if action.parameters else ""
+                params_str = orjson.dumps(action.parameters, option=orjson.OPT_SORT_KEYS) if action.parameters else b""
                 action_key = (action.action_type.value, action.agent_name, params_str)
                 
                 # Skip duplicates
@@ -337,9 +362,7 @@ class MultiAgentWorkflow:
                 timestamp=datetime.now()
             )
             
-            # Ensure conversation_history is a list and append message
-            if not hasattr(conversation_state, 'conversation_history') or conversation_state.conversation_history is None:
-                conversation_state.conversation_history = []
+            # conversation_history is always a list (schema default_factory)
             conversation_state.conversation_history.append(assistant_message)
             
             return {
@@ -372,7 +395,8 @@ class MultiAgentWorkflow:
             "final_response": final_response
         }
     
-    def _should_continue_or_respond(self, state: WorkflowState) -> str:
+    @staticmethod
+    def _should_continue_or_respond(state: WorkflowState) -> str:
         """Conditional routing: determine next step after action execution"""
         
         if state.get("error"):
@@ -441,7 +465,22 @@ class MultiAgentWorkflow:
         
         if not agent_responses:
             return self._create_fallback_response(conversation_state.session_id)
-        
+
+        # Fast path: with exactly one response (the common case) there is nothing
+        # to score, so convert it directly without going through selection
+        if len(agent_responses) == 1:
+            response = agent_responses[0]
+            metadata = response.metadata or {}
+            return ChatResponse(
+                message=response.content,
+                response_format=response.response_format,
+                quick_replies=response.quick_replies,
+                carousel_items=metadata.get("carousel_items", []) if response.response_format == ResponseFormat.CAROUSEL else [],
+                form_fields=metadata.get("form_fields", []) if response.response_format == ResponseFormat.FORM else [],
+                metadata=metadata,
+                session_id=conversation_state.session_id
+            )
+
         # Intelligent response selection: prefer actual results over fallbacks
         primary_response = self._select_best_response(agent_responses)
         
@@ -1,35 +1,164 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from typing import Dict, List, Optional
-import json
+from fastapi.responses import ORJSONResponse, Response
+from typing import Dict, List, Optional, Union
+import asyncio
+import hashlib
+import logging
+import orjson
+import queue
 import uuid
+from collections import OrderedDict
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings, BusinessConfig, BusinessType
+from app.core.tasks import route_for_message, run_workflow
+from pydantic import TypeAdapter
 
-from app.core.config import settings, BusinessType
 from app.models.schemas import ChatRequest, ChatResponse, ConversationMessage
 from app.agents.workflow import MultiAgentWorkflow
 
 
+# Non-blocking logging: handlers run on a background thread via
+# QueueListener so the event loop never waits on a stdout write
+logger = logging.getLogger("app.api")
+_log_listener: Optional[QueueListener] = None
+
+
+def _setup_logging() -> QueueListener:
+    """Route this module's log records through a background listener thread"""
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+
 # Global workflow instances for different business types
 workflows: Dict[str, MultiAgentWorkflow] = {}
 
+# Pre-serialized /api/business-types payload, built once at startup since
+# business configurations are static for the process lifetime
+_business_types_json: bytes = b"{}"
+
+# Redis-backed conversation history cache (best-effort: all cache errors
+# fall through to the workflow's own store)
+_redis: Optional[aioredis.Redis] = None
+
+# Last business type seen per WebSocket session, used to flush the cached
+# history at workflow boundaries (preserve within a workflow, flush on switch)
+_session_business_types: Dict[str, str] = {}
+
+
+# Keys are scoped per business type: each type has its own workflow and
+# MemorySaver, so the same session id can hold distinct histories
+async def _history_cache_get(session_id: str, business_type: str) -> Optional[bytes]:
+    if _redis is None:
+        return None
+    try:
+        return await _redis.get(f"session:{session_id}:{business_type}")
+    except Exception:
+        return None
+
+
+async def _history_cache_set(session_id: str, business_type: str, payload: bytes):
+    if _redis is None:
+        return
+    try:
+        await _redis.setex(f"session:{session_id}:{business_type}", settings.session_cache_ttl, payload)
+    except Exception:
+        pass
+
+
+async def _history_cache_flush(session_id: str, business_type: str):
+    if _redis is None:
+        return
+    try:
+        await _redis.delete(f"session:{session_id}:{business_type}")
+    except Exception:
+        pass
+
+
+def _build_business_types_payload() -> bytes:
+    """Build the /api/business-types response from the static business configs"""
+    business_configs = {}
+
+    for business_type in BusinessType:
+        config = BusinessConfig(business_type)
+
+        business_configs[business_type.value] = {
+            "name": business_type.value.replace("_", " ").title(),
+            "conversation_types": [ct.value for ct in config.config["conversation_types"]],
+            "product_fields": config.config.get("product_fields", []),
+            "process_stages": config.config.get("process_stages", []),
+            "quick_replies": config.config.get("quick_replies", {})
+        }
+
+    return orjson.dumps(business_configs, option=orjson.OPT_NON_STR_KEYS)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize workflows on startup"""
-    
+    global _business_types_json, _redis, _log_listener
+
+    _log_listener = _setup_logging()
+
     # Initialize workflows for each business type
     for business_type in BusinessType:
         workflows[business_type.value] = MultiAgentWorkflow(business_type)
-    
-    print(f"✅ Multi-Agent Customer Service Platform initialized for {len(workflows)} business types")
-    
+
+    # Static read-only payloads are serialized once here
+    _business_types_json = _build_business_types_payload()
+    app.state.root_bytes = orjson.dumps({
+        "message": "Multi-Agent Customer Service Platform",
+        "version": "1.0.0",
+        "supported_business_types": [bt.value for bt in BusinessType],
+        "features": [
+            "Intent Classification",
+            "Product Discovery & Details",
+            "Process Guidance",
+            "Multi-turn Conversations",
+            "Business-specific Workflows"
+        ]
+    })
+    app.state.health_bytes = orjson.dumps({
+        "status": "healthy",
+        "active_workflows": len(workflows),
+        "business_types": list(workflows.keys())
+    })
+
+    # Conversation history cache (optional: the app works without Redis)
+    try:
+        _redis = aioredis.from_url(settings.redis_url)
+    except Exception as e:
+        logger.warning("Redis unavailable, conversation history cache disabled: %s", e)
+        _redis = None
+
+    logger.info("Multi-Agent Customer Service Platform initialized for %d business types", len(workflows))
+
+    sweeper = asyncio.create_task(_sweep_sessions())
+
     yield
-    
+
+    sweeper.cancel()
+
     # Cleanup on shutdown
+    if _redis is not None:
+        try:
+            await _redis.close()
+        except Exception:
+            pass
     workflows.clear()
-    print("🔄 Application shutdown complete")
+    logger.info("Application shutdown complete")
+    if _log_listener is not None:
+        _log_listener.stop()
 
 
 # Initialize FastAPI app
@@ -37,76 +166,233 @@ app = FastAPI(
     title="Multi-Agent Customer Service Platform",
     description="Universal AI-powered customer service system that adapts to any business domain",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+class PrecompiledCORSMiddleware(CORSMiddleware):
+    """CORS middleware with an O(1) frozenset origin check.
+
+    Starlette scans the allowed-origins list per request; with a tightened
+    production allowlist this makes the hot preflight path a set lookup.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._origin_set = frozenset(self.allow_origins)
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        if self.allow_all_origins:
+            return True
+        if self.allow_origin_regex is not None and self.allow_origin_regex.fullmatch(origin):
+            return True
+        return origin in self._origin_set
+
+
 # Add CORS middleware
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure for production
+    PrecompiledCORSMiddleware,
+    allow_origins=settings.cors_origins,  # ["*"] by default; configure for production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
+class Conn:
+    """Per-connection state packed into one slotted object.
+
+    One dict lookup reaches everything the hot send path needs, and __slots__
+    keeps instances compact so idle/metrics sweeps over all connections stay
+    cache-friendly.
+    """
+
+    __slots__ = ("ws", "queue", "writer_task", "last_activity")
+
+    def __init__(self, ws: WebSocket, queue: asyncio.Queue, writer_task: asyncio.Task):
+        self.ws = ws
+        self.queue = queue
+        self.writer_task = writer_task
+        self.last_activity = asyncio.get_running_loop().time()
+
+
 # WebSocket connection manager
 class ConnectionManager:
+    # Coalesce bursty sends into one writer wakeup: flush once WRITE_DELAY
+    # elapses or MAX_MESSAGES_PER_FLUSH messages are pending, whichever
+    # comes first. Each message still goes out as its own frame.
+    WRITE_DELAY = 0.005
+    MAX_MESSAGES_PER_FLUSH = 16
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-    
+        # LRU order: least-recently-active sessions sit at the front, so
+        # capacity eviction pops from there
+        self._conns: "OrderedDict[str, Conn]" = OrderedDict()
+
     async def connect(self, websocket: WebSocket, session_id: str):
         await websocket.accept()
-        self.active_connections[session_id] = websocket
-    
+        # Bounded queue so a slow client cannot buffer unbounded output
+        queue = asyncio.Queue(maxsize=settings.ws_queue_max)
+        writer_task = asyncio.create_task(self._writer(websocket, queue))
+        self._conns[session_id] = Conn(websocket, queue, writer_task)
+        if len(self._conns) > settings.max_sessions:
+            oldest_sid = next(iter(self._conns))
+            await self._evict(oldest_sid)
+
     def disconnect(self, session_id: str):
-        if session_id in self.active_connections:
-            del self.active_connections[session_id]
-    
-    async def send_message(self, session_id: str, message: dict):
-        if session_id in self.active_connections:
-            websocket = self.active_connections[session_id]
-            await websocket.send_text(json.dumps(message))
+        conn = self._conns.pop(session_id, None)
+        if conn is not None:
+            conn.writer_task.cancel()
+
+    async def _evict(self, session_id: str):
+        """Close and drop a session picked by the LRU/idle policy"""
+        conn = self._conns.get(session_id)
+        if conn is None:
+            return
+        logger.info("Evicting session %s", session_id)
+        self.disconnect(session_id)
+        business_type = _session_business_types.pop(session_id, None)
+        if business_type is not None:
+            await _history_cache_flush(session_id, business_type)
+        try:
+            await conn.ws.close(code=1013)  # Try Again Later
+        except Exception:
+            pass
+
+    async def sweep_idle(self):
+        """Evict sessions with no activity for settings.session_idle_s seconds"""
+        cutoff = asyncio.get_running_loop().time() - settings.session_idle_s
+        # Entries are LRU-ordered, so the scan stops at the first fresh one
+        stale = []
+        for sid, conn in self._conns.items():
+            if conn.last_activity >= cutoff:
+                break
+            stale.append(sid)
+        for sid in stale:
+            await self._evict(sid)
+
+    def touch(self, session_id: str):
+        """Mark a session as recently active and refresh its LRU position"""
+        conn = self._conns.get(session_id)
+        if conn is not None:
+            conn.last_activity = asyncio.get_running_loop().time()
+            self._conns.move_to_end(session_id)
+
+    async def send_message(self, session_id: str, message: Union[dict, bytes]):
+        conn = self._conns.get(session_id)
+        if conn is None:
+            return
+        conn.last_activity = asyncio.get_running_loop().time()
+        self._conns.move_to_end(session_id)
+        try:
+            conn.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Client is not keeping up - drop the connection instead of
+            # letting the outbound buffer grow without bound
+            logger.warning("Outbound queue full for session %s, closing connection", session_id)
+            self.disconnect(session_id)
+            try:
+                await conn.ws.close(code=1013)  # Try Again Later
+            except Exception:
+                pass
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Drain the outbound queue, flushing bursts in a single wakeup"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                messages = [await queue.get()]
+                deadline = loop.time() + self.WRITE_DELAY
+                while len(messages) < self.MAX_MESSAGES_PER_FLUSH:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        messages.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Preserialized payloads (bytes) pass straight through.
+                # One frame per message — clients parse each event.data as a
+                # single JSON object — but the whole burst flushes in this
+                # one wakeup, so scheduling overhead stays amortized.
+                for message in messages:
+                    payload = message if isinstance(message, bytes) else orjson.dumps(message)
+                    await websocket.send_text(payload.decode())
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Connection dropped mid-send; the receive loop handles cleanup
+            pass
 
 
 manager = ConnectionManager()
 
 
+async def _sweep_sessions():
+    """Periodically evict idle WebSocket sessions so memory stays bounded"""
+    while True:
+        await asyncio.sleep(settings.session_sweep_interval)
+        try:
+            await manager.sweep_idle()
+        except Exception:
+            logger.exception("Session sweep failed")
+
+# Preserialized payloads for the common WebSocket error paths
+_ERR_MISSING_MSG = orjson.dumps({"error": "Message is required"})
+_ERR_MSG_TOO_LONG = orjson.dumps({"error": "Message too long"})
+_ERR_BAD_BT = orjson.dumps({"error": "Unknown business type"})
+
+# Batch serializer for conversation histories (built once at import)
+_HISTORY_ADAPTER = TypeAdapter(List[ConversationMessage])
+
+# Value -> member map plus a frozenset membership check; avoids the Enum
+# __call__ machinery (and its ValueError on bad input) on every frame
+_BT_CACHE = {bt.value: bt for bt in BusinessType}
+_BT_VALUES = frozenset(_BT_CACHE)
+
+
 def get_workflow(business_type: str) -> MultiAgentWorkflow:
     """Get workflow instance for business type"""
-    if business_type not in workflows:
+    workflow = workflows.get(business_type)
+    if workflow is None:
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail=f"Unsupported business type: {business_type}"
         )
-    return workflows[business_type]
+    return workflow
+
+
+async def execute_workflow(chat_request: ChatRequest) -> ChatResponse:
+    """Run the workflow in-process, or on a Celery worker when enabled"""
+    if settings.use_celery:
+        # CPU-heavy agent steps run in a worker process; the event loop
+        # only blocks a thread waiting on the result
+        queue, priority = route_for_message(chat_request.message)
+        async_result = run_workflow.apply_async(
+            args=[chat_request.dict(), chat_request.business_type.value],
+            queue=queue,
+            priority=priority
+        )
+        response_data = await asyncio.to_thread(
+            async_result.get, timeout=settings.celery_task_timeout
+        )
+        return ChatResponse(**response_data)
+
+    workflow = get_workflow(chat_request.business_type.value)
+    return await workflow.process_message(chat_request)
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint with platform information"""
-    return {
-        "message": "Multi-Agent Customer Service Platform",
-        "version": "1.0.0",
-        "supported_business_types": [bt.value for bt in BusinessType],
-        "features": [
-            "Intent Classification",
-            "Product Discovery & Details",
-            "Process Guidance",
-            "Multi-turn Conversations",
-            "Business-specific Workflows"
-        ]
-    }
+    return Response(content=request.app.state.root_bytes, media_type="application/json")
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "active_workflows": len(workflows),
-        "business_types": list(workflows.keys())
-    }
+    return Response(content=request.app.state.health_bytes, media_type="application/json")
 
 
 @app.post("/api/chat/message", response_model=ChatResponse)
@@ -114,13 +400,15 @@ async def process_chat_message(chat_request: ChatRequest):
     """Process a single chat message through the multi-agent system"""
     
     try:
-        # Get appropriate workflow
-        workflow = get_workflow(chat_request.business_type.value)
-        
-        # Process the message
-        response = await workflow.process_message(chat_request)
-        
-        return response
+        # Validate business type, then process the message
+        get_workflow(chat_request.business_type.value)
+        response = await execute_workflow(chat_request)
+        # The workflow just appended to this session's history; drop the
+        # cached copy so the next history read is fresh
+        await _history_cache_flush(chat_request.session_id, chat_request.business_type.value)
+
+        # Serialize once via orjson instead of jsonable_encoder + stdlib json
+        return ORJSONResponse(content=response.model_dump(mode="json"))
         
     except Exception as e:
         raise HTTPException(
@@ -136,14 +424,25 @@ async def get_conversation_history(
 ):
     """Get conversation history for a session"""
     
+    # Validate the business type before consulting the cache, so unknown
+    # types 400 on hits and misses alike
+    workflow = get_workflow(business_type)
+
     try:
-        workflow = get_workflow(business_type)
-        history = await workflow.get_conversation_history(session_id)
-        
+        cached = await _history_cache_get(session_id, business_type)
+        if cached is not None:
+            history_data = orjson.loads(cached)
+        else:
+            history = await workflow.get_conversation_history(session_id)
+            # One Rust-level pass over the whole list instead of a Python
+            # loop of per-message .dict() calls
+            history_data = _HISTORY_ADAPTER.dump_python(history, mode="json")
+            await _history_cache_set(session_id, business_type, orjson.dumps(history_data))
+
         return {
             "session_id": session_id,
-            "message_count": len(history),
-            "history": [msg.dict() for msg in history]
+            "message_count": len(history_data),
+            "history": history_data
         }
         
     except Exception as e:
@@ -163,7 +462,8 @@ async def clear_conversation_history(
     try:
         workflow = get_workflow(business_type)
         success = await workflow.clear_conversation(session_id)
-        
+        await _history_cache_flush(session_id, business_type)
+
         return {
             "session_id": session_id,
             "cleared": success
@@ -181,79 +481,94 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time chat"""
     
     await manager.connect(websocket, session_id)
-    
-    try:
-        while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            
+
+    # Overlap LLM-bound processing with the next receive: each message runs
+    # as its own task, with the semaphore bounding in-flight work per
+    # connection. Responses still go through the coalescing writer queue.
+    semaphore = asyncio.Semaphore(settings.per_conn_concurrency)
+
+    async def _handle(message_data: dict):
+        try:
             # Extract business type and message
             business_type = message_data.get("business_type", "generic")
             user_message = message_data.get("message", "")
             context = message_data.get("context", {})
-            
+
             if not user_message:
-                await manager.send_message(session_id, {
-                    "error": "Message is required"
-                })
-                continue
-            
-            # Create chat request
-            chat_request = ChatRequest(
+                await manager.send_message(session_id, _ERR_MISSING_MSG)
+                return
+
+            if len(user_message) > settings.max_message_len:
+                await manager.send_message(session_id, _ERR_MSG_TOO_LONG)
+                return
+
+            if business_type not in _BT_VALUES:
+                await manager.send_message(session_id, _ERR_BAD_BT)
+                return
+
+            # Stage-aware cache policy: preserve within a workflow, flush
+            # the previous type's entry when the session switches
+            previous_type = _session_business_types.get(session_id)
+            if previous_type != business_type:
+                _session_business_types[session_id] = business_type
+                if previous_type is not None:
+                    await _history_cache_flush(session_id, previous_type)
+
+            # Create chat request; model_construct skips validation since
+            # everything except the length-checked message is trusted
+            # per-session data
+            chat_request = ChatRequest.model_construct(
                 message=user_message,
                 session_id=session_id,
-                business_type=BusinessType(business_type),
+                business_type=_BT_CACHE[business_type],
                 context=context
             )
-            
+
             try:
-                # Get workflow and process message
-                workflow = get_workflow(business_type)
-                response = await workflow.process_message(chat_request)
-                
+                response = await execute_workflow(chat_request)
+
                 # Send response back to client
                 await manager.send_message(session_id, response.dict())
-                
+
+                # History grew by two messages, so the cached copy is stale
+                await _history_cache_flush(session_id, business_type)
+
             except Exception as e:
                 await manager.send_message(session_id, {
                     "error": f"Processing error: {str(e)}",
                     "session_id": session_id
                 })
-    
-    except WebSocketDisconnect:
-        manager.disconnect(session_id)
-    except Exception as e:
-        print(f"WebSocket error for session {session_id}: {e}")
+        finally:
+            semaphore.release()
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            while True:
+                try:
+                    # Receive message from client
+                    data = await websocket.receive_text()
+                except WebSocketDisconnect:
+                    break
+                manager.touch(session_id)
+                await semaphore.acquire()
+                tg.create_task(_handle(orjson.loads(data)))
+    except Exception:
+        logger.exception("WebSocket error for session %s", session_id)
+    finally:
         manager.disconnect(session_id)
+        _session_business_types.pop(session_id, None)
 
 
 @app.get("/api/business-types")
 async def get_business_types():
     """Get available business types and their configurations"""
-    
-    business_configs = {}
-    
-    for business_type in BusinessType:
-        from app.core.config import BusinessConfig
-        config = BusinessConfig(business_type)
-        
-        business_configs[business_type.value] = {
-            "name": business_type.value.replace("_", " ").title(),
-            "conversation_types": [ct.value for ct in config.config["conversation_types"]],
-            "product_fields": config.config.get("product_fields", []),
-            "process_stages": config.config.get("process_stages", []),
-            "quick_replies": config.config.get("quick_replies", {})
-        }
-    
-    return business_configs
 
+    return Response(content=_business_types_json, media_type="application/json")
 
-@app.get("/api/demo/widget")
-async def get_demo_widget():
-    """Get a demo chat widget for testing"""
-    
-    html_content = """
+
+# The demo widget page is fully static: encode it once at import time and
+# serve the prebuilt bytes with an ETag so browsers/CDNs can 304
+_DEMO_WIDGET_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -790,9 +1105,21 @@ async def get_demo_widget():
 </script>
 </body>
 </html>
-    """
-    
-    return HTMLResponse(content=html_content)
+"""
+
+_DEMO_HTML_BYTES = _DEMO_WIDGET_HTML.encode("utf-8")
+_DEMO_ETAG = hashlib.blake2b(_DEMO_HTML_BYTES, digest_size=16).hexdigest()
+_DEMO_HEADERS = {"ETag": _DEMO_ETAG, "Cache-Control": "public, max-age=3600"}
+
+
+@app.get("/api/demo/widget")
+async def get_demo_widget(request: Request):
+    """Get a demo chat widget for testing"""
+
+    if request.headers.get("if-none-match") == _DEMO_ETAG:
+        return Response(status_code=304, headers=_DEMO_HEADERS)
+
+    return Response(content=_DEMO_HTML_BYTES, media_type="text/html", headers=_DEMO_HEADERS)
 
 
 if __name__ == "__main__":
@@ -801,5 +1128,12 @@ if __name__ == "__main__":
         "app.api.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=settings.debug
-    ) 
\ No newline at end of file
+        reload=settings.debug,
+        loop="uvloop",
+        http="httptools",
+        # permessage-deflate pays off here because the coalescing writer
+        # batches bursts into frames large enough to amortize the CPU cost
+        ws="websockets",
+        ws_per_message_deflate=True,
+        ws_max_size=settings.ws_max_size,
+    )
\ No newline at end of file
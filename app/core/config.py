@@ -1,7 +1,9 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Mapping, Optional, Any
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 
 
 class BusinessType(str, Enum):
@@ -28,6 +30,12 @@ class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./customer_service.db"
     redis_url: str = "redis://localhost:6379"
+    session_cache_ttl: int = 1800  # Seconds to keep cached conversation history in Redis
+
+    # Task queue (offload workflow processing to Celery workers)
+    use_celery: bool = False
+    celery_broker_url: str = "redis://localhost:6379/1"
+    celery_task_timeout: int = 30
     
     # Vector Store
     chroma_persist_directory: str = "./data/chroma"
@@ -36,6 +44,14 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     debug: bool = True
+    ws_queue_max: int = 64  # Max buffered outbound WebSocket messages per connection
+    ws_max_size: int = 1048576  # Max inbound WebSocket frame size in bytes
+    max_message_len: int = 4096  # Max accepted chat message length
+    per_conn_concurrency: int = 4  # Max in-flight messages per WebSocket connection
+    max_sessions: int = 1000  # Max concurrent WebSocket sessions before LRU eviction
+    session_idle_s: int = 900  # Evict WebSocket sessions idle longer than this
+    session_sweep_interval: int = 60  # Seconds between idle-session sweeps
+    cors_origins: List[str] = ["*"]  # Tighten for production deployments
     
     # Business Configuration
     business_type: BusinessType = BusinessType.GENERIC
@@ -46,118 +62,163 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
+# Shared configuration across all business types, built once at import.
+# MappingProxyType keeps the shared dicts read-only so a caller cannot
+# mutate configuration out from under the cached copies.
+_BASE_CONFIG = MappingProxyType({
+    "conversation_types": [
+        ConversationType.COMPANY_INFO,
+        ConversationType.PRODUCT_DISCOVERY,
+        ConversationType.PRODUCT_DETAIL,
+        ConversationType.PROCESS_QUESTIONS,
+        ConversationType.GENERAL_CONVERSATION
+    ],
+    "required_params": {
+        ConversationType.PRODUCT_DISCOVERY: ["preferences", "budget_range"],
+        ConversationType.PRODUCT_DETAIL: ["product_id", "product_name"],
+        ConversationType.PROCESS_QUESTIONS: ["stage", "order_id"]
+    },
+    "quick_replies": {
+        ConversationType.COMPANY_INFO: [
+            "Tell me about your company",
+            "What services do you offer?",
+            "Where are you located?"
+        ],
+        ConversationType.PRODUCT_DISCOVERY: [
+            "Show me recommendations",
+            "What's popular?",
+            "Filter by price"
+        ],
+        ConversationType.PRODUCT_DETAIL: [
+            "Show me specifications",
+            "Compare with similar products",
+            "Check availability",
+            "Read reviews"
+        ]
+    }
+})
+
+# Conversation flow configurations, shared by every BusinessConfig instance
+_FLOWS = MappingProxyType({
+    ConversationType.COMPANY_INFO: {
+        "intent": "Provide information about the business",
+        "actions": ["search_company_info", "get_business_details"],
+        "response_format": "informational"
+    },
+    ConversationType.PRODUCT_DISCOVERY: {
+        "intent": "Help user discover products/services",
+        "actions": ["search_products", "filter_results", "recommend_items"],
+        "response_format": "carousel_with_details"
+    },
+    ConversationType.PRODUCT_DETAIL: {
+        "intent": "Provide detailed information about specific products",
+        "actions": ["get_product_details", "compare_products", "get_reviews"],
+        "response_format": "detailed_product_view"
+    },
+    ConversationType.PROCESS_QUESTIONS: {
+        "intent": "Guide user through business processes",
+        "actions": ["get_process_info", "track_status", "provide_next_steps"],
+        "response_format": "step_by_step"
+    },
+    ConversationType.GENERAL_CONVERSATION: {
+        "intent": "Engage in helpful conversation",
+        "actions": ["general_response", "redirect_if_needed"],
+        "response_format": "conversational"
+    }
+})
+
+
+# Per-business deltas over _BASE_CONFIG; only the selected one is merged
+_BUSINESS_OVERRIDES = MappingProxyType({
+    BusinessType.ECOMMERCE: {
+        "product_fields": ["name", "price", "description", "category", "in_stock"],
+        "search_fields": ["category", "brand", "price_range", "rating"],
+        "process_stages": ["cart", "checkout", "payment", "shipping", "delivery"],
+        "external_apis": ["shopify", "stripe", "shipstation"]
+    },
+
+    BusinessType.HOTEL: {
+        "product_fields": ["room_type", "price_per_night", "amenities", "availability"],
+        "search_fields": ["check_in", "check_out", "guests", "location", "amenities"],
+        "process_stages": ["search", "booking", "payment", "confirmation", "check_in"],
+        "external_apis": ["booking_engine", "pms", "payment_gateway"]
+    },
+
+    BusinessType.REAL_ESTATE: {
+        "product_fields": ["property_type", "price", "bedrooms", "location", "features"],
+        "search_fields": ["location", "price_range", "property_type", "bedrooms"],
+        "process_stages": ["inquiry", "viewing", "application", "approval", "signing"],
+        "external_apis": ["mls", "crm", "document_signing"]
+    },
+
+    BusinessType.RENTAL: {
+        "product_fields": ["item_name", "daily_rate", "availability", "condition"],
+        "search_fields": ["category", "date_range", "location", "price_range"],
+        "process_stages": ["reservation", "pickup", "usage", "return", "billing"],
+        "external_apis": ["inventory_system", "payment_processor"]
+    }
+})
+
+
+@lru_cache(maxsize=None)
+def _get_business_config(business_type: BusinessType) -> Dict[str, Any]:
+    """Build (once per business type) the merged business configuration.
+
+    Returns a plain dict: the agents feed this straight into orjson/json
+    for prompt templates, and neither serializer accepts a mappingproxy.
+    The read-only source tables above still guard the canonical values.
+    """
+    overrides = _BUSINESS_OVERRIDES.get(business_type)
+    if overrides is None:
+        return dict(_BASE_CONFIG)
+    return {**_BASE_CONFIG, **overrides}
+
+
+@lru_cache(maxsize=128)
+def _lookup_flow(path: tuple) -> Any:
+    """Walk _FLOWS once per dotted path and cache the leaf.
+
+    The first path element may be a ConversationType member, its value
+    ("product_discovery") or its name ("PRODUCT_DISCOVERY").
+    """
+    head, *rest = path
+    if not isinstance(head, ConversationType):
+        try:
+            head = ConversationType(head)
+        except ValueError:
+            head = ConversationType[head]
+
+    node: Any = _FLOWS.get(head, _FLOWS[ConversationType.GENERAL_CONVERSATION])
+    for key in rest:
+        node = node[key]
+    return node
+
+
 class BusinessConfig:
     """Generic business configuration that adapts to different domains"""
-    
+
     def __init__(self, business_type: BusinessType):
         self.business_type = business_type
-        self.config = self._get_business_config()
-    
-    def _get_business_config(self) -> Dict[str, Any]:
-        """Get business-specific configuration"""
-        
-        base_config = {
-            "conversation_types": [
-                ConversationType.COMPANY_INFO,
-                ConversationType.PRODUCT_DISCOVERY,
-                ConversationType.PRODUCT_DETAIL,
-                ConversationType.PROCESS_QUESTIONS,
-                ConversationType.GENERAL_CONVERSATION
-            ],
-            "required_params": {
-                ConversationType.PRODUCT_DISCOVERY: ["preferences", "budget_range"],
-                ConversationType.PRODUCT_DETAIL: ["product_id", "product_name"],
-                ConversationType.PROCESS_QUESTIONS: ["stage", "order_id"]
-            },
-            "quick_replies": {
-                ConversationType.COMPANY_INFO: [
-                    "Tell me about your company",
-                    "What services do you offer?",
-                    "Where are you located?"
-                ],
-                ConversationType.PRODUCT_DISCOVERY: [
-                    "Show me recommendations",
-                    "What's popular?",
-                    "Filter by price"
-                ],
-                ConversationType.PRODUCT_DETAIL: [
-                    "Show me specifications",
-                    "Compare with similar products",
-                    "Check availability",
-                    "Read reviews"
-                ]
-            }
-        }
-        
-        # Business-specific configurations
-        business_configs = {
-            BusinessType.ECOMMERCE: {
-                **base_config,
-                "product_fields": ["name", "price", "description", "category", "in_stock"],
-                "search_fields": ["category", "brand", "price_range", "rating"],
-                "process_stages": ["cart", "checkout", "payment", "shipping", "delivery"],
-                "external_apis": ["shopify", "stripe", "shipstation"]
-            },
-            
-            BusinessType.HOTEL: {
-                **base_config,
-                "product_fields": ["room_type", "price_per_night", "amenities", "availability"],
-                "search_fields": ["check_in", "check_out", "guests", "location", "amenities"],
-                "process_stages": ["search", "booking", "payment", "confirmation", "check_in"],
-                "external_apis": ["booking_engine", "pms", "payment_gateway"]
-            },
-            
-            BusinessType.REAL_ESTATE: {
-                **base_config,
-                "product_fields": ["property_type", "price", "bedrooms", "location", "features"],
-                "search_fields": ["location", "price_range", "property_type", "bedrooms"],
-                "process_stages": ["inquiry", "viewing", "application", "approval", "signing"],
-                "external_apis": ["mls", "crm", "document_signing"]
-            },
-            
-            BusinessType.RENTAL: {
-                **base_config,
-                "product_fields": ["item_name", "daily_rate", "availability", "condition"],
-                "search_fields": ["category", "date_range", "location", "price_range"],
-                "process_stages": ["reservation", "pickup", "usage", "return", "billing"],
-                "external_apis": ["inventory_system", "payment_processor"]
-            }
-        }
-        
-        return business_configs.get(self.business_type, base_config)
-    
+        self.config = _get_business_config(business_type)
+
     def get_conversation_flow(self, conversation_type: ConversationType) -> Dict[str, Any]:
         """Get conversation flow configuration for a specific type"""
-        flows = {
-            ConversationType.COMPANY_INFO: {
-                "intent": "Provide information about the business",
-                "actions": ["search_company_info", "get_business_details"],
-                "response_format": "informational"
-            },
-            ConversationType.PRODUCT_DISCOVERY: {
-                "intent": "Help user discover products/services",
-                "actions": ["search_products", "filter_results", "recommend_items"],
-                "response_format": "carousel_with_details"
-            },
-            ConversationType.PRODUCT_DETAIL: {
-                "intent": "Provide detailed information about specific products",
-                "actions": ["get_product_details", "compare_products", "get_reviews"],
-                "response_format": "detailed_product_view"
-            },
-            ConversationType.PROCESS_QUESTIONS: {
-                "intent": "Guide user through business processes",
-                "actions": ["get_process_info", "track_status", "provide_next_steps"],
-                "response_format": "step_by_step"
-            },
-            ConversationType.GENERAL_CONVERSATION: {
-                "intent": "Engage in helpful conversation",
-                "actions": ["general_response", "redirect_if_needed"],
-                "response_format": "conversational"
-            }
-        }
-        
-        return flows.get(conversation_type, flows[ConversationType.GENERAL_CONVERSATION])
-
-
-# Global settings instance
-settings = Settings() 
\ No newline at end of file
+        return _lookup_flow((conversation_type,))
+
+    def get(self, dotted_path: str) -> Any:
+        """Dotted-path flow accessor, e.g. get("PRODUCT_DISCOVERY.actions")"""
+        return _lookup_flow(tuple(dotted_path.split(".")))
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build the Settings instance on first use (env/.env parsing deferred)"""
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Keep `from app.core.config import settings` working without paying
+    # the .env parse at module import; tests can get_settings.cache_clear()
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
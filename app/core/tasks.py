@@ -0,0 +1,63 @@
+from typing import Dict
+
+from celery import Celery
+
+from app.core.config import BusinessType, settings
+
+
+# Celery application for offloading CPU-heavy agent workflow stages out of
+# the API event loop. Short interactive messages go to the "realtime" queue,
+# long-running retrieval/LLM-heavy ones to "heavy". Run workers with e.g.:
+#   celery -A app.core.tasks worker -Q realtime -c 16 --pool=gevent
+#   celery -A app.core.tasks worker -Q heavy -c 4 --pool=prefork
+celery_app = Celery(
+    "customer_service",
+    broker=settings.celery_broker_url,
+    backend=settings.celery_broker_url,
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_default_queue="realtime",
+    task_queue_max_priority=10,
+)
+
+# Messages short enough to classify-and-answer quickly take the realtime
+# queue at high priority; everything else takes the heavy queue
+REALTIME_MAX_MESSAGE_LEN = 256
+
+
+def route_for_message(message: str):
+    """Pick (queue, priority) for a chat message"""
+    if len(message) <= REALTIME_MAX_MESSAGE_LEN:
+        return "realtime", 9
+    return "heavy", 3
+
+
+# One workflow instance per business type per worker process
+_worker_workflows: Dict[BusinessType, "MultiAgentWorkflow"] = {}
+
+
+def _get_worker_workflow(business_type: BusinessType):
+    """Get (or lazily create) the workflow for a business type in this worker"""
+    from app.agents.workflow import MultiAgentWorkflow
+
+    workflow = _worker_workflows.get(business_type)
+    if workflow is None:
+        workflow = _worker_workflows[business_type] = MultiAgentWorkflow(business_type)
+    return workflow
+
+
+@celery_app.task(name="app.run_workflow")
+def run_workflow(chat_request_data: dict, business_type: str) -> dict:
+    """Run the multi-agent workflow for one chat message in a worker process"""
+    import asyncio
+
+    from app.models.schemas import ChatRequest
+
+    workflow = _get_worker_workflow(BusinessType(business_type))
+    chat_request = ChatRequest(**chat_request_data)
+    response = asyncio.run(workflow.process_message(chat_request))
+    return response.dict()
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Float, Boolean, Text, DateTime, JSON, Index, Integer
+from sqlalchemy import Column, String, Float, Boolean, Text, DateTime, JSON, Index, Integer, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Mapped, Session, mapped_column
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import json
+import orjson
 
 from app.core.config import BusinessType
 
@@ -14,25 +15,36 @@ Base = declarative_base()
 class Product(Base):
     __tablename__ = "products"
     
-    id = Column(String(255), primary_key=True)
-    name = Column(String(500), nullable=False)
-    description = Column(Text)
-    price = Column(Float)
-    category = Column(String(100))
-    business_type = Column(String(50), nullable=False)
-    product_metadata = Column(JSON)  # Store custom attributes like color, size, etc.
-    availability = Column(Boolean, default=True)
-    image_url = Column(String(1000))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    name: Mapped[str] = mapped_column(String(500), nullable=False)
+    # Heavy columns are deferred so list queries keep rows narrow; callers
+    # that build full items undefer the 'heavy' group in one extra-free query
+    description: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group='heavy')
+    price: Mapped[Optional[float]] = mapped_column(Float)
+    category: Mapped[Optional[str]] = mapped_column(String(100))
+    business_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Store custom attributes like color, size, etc.
+    product_metadata: Mapped[Optional[dict]] = mapped_column(JSON, deferred=True, deferred_group='heavy')
+    availability: Mapped[bool] = mapped_column(Boolean, default=True)
+    image_url: Mapped[Optional[str]] = mapped_column(String(1000))
+    # Timestamps are generated in the database (CURRENT_TIMESTAMP on
+    # SQLite): no per-row Python datetime allocation or bound parameter.
+    # onupdate stays a SQL expression so UPDATEs refresh it server-side too.
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
     
-    # Indexes for better search performance
+    # Composite indexes matching the dominant query shapes: every repository
+    # query leads with business_type, then filters category/price/availability
+    # or searches by name. idx_prod_search is a partial covering index for
+    # the in-stock branch (the overwhelmingly common availability filter),
+    # answering bt/category/availability/price predicates from the index
+    # alone; the full composite still serves queries with no availability
+    # predicate, which a partial index cannot.
     __table_args__ = (
-        Index('idx_business_type', 'business_type'),
-        Index('idx_category', 'category'),
-        Index('idx_price', 'price'),
-        Index('idx_availability', 'availability'),
-        Index('idx_name', 'name'),
+        Index('idx_prod_search', 'business_type', 'category', 'availability', 'price',
+              sqlite_where=text('availability = 1')),
+        Index('idx_bt_cat_price_avail', 'business_type', 'category', 'price', 'availability'),
+        Index('idx_bt_name', 'business_type', 'name'),
     )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -50,6 +62,30 @@ class Product(Base):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
     
+    @classmethod
+    def to_dicts_batch(cls, rows: List["Product"]) -> bytes:
+        """Serialize many products to a JSON array in one pass.
+
+        Builds the whole list before a single orjson.dumps call, so list
+        responses skip per-row dict churn and Python-level isoformat()
+        (orjson formats datetimes in C).
+        """
+        return orjson.dumps([
+            {
+                'id': row.id,
+                'name': row.name,
+                'description': row.description,
+                'price': row.price,
+                'category': row.category,
+                'metadata': row.product_metadata or {},
+                'availability': row.availability,
+                'image_url': row.image_url,
+                'created_at': row.created_at,
+                'updated_at': row.updated_at,
+            }
+            for row in rows
+        ], option=orjson.OPT_NAIVE_UTC)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any], business_type: BusinessType):
         """Create Product from dictionary"""
@@ -89,7 +89,9 @@ class ProductItem(BaseModel):
     description: str
     price: Optional[float] = None
     category: Optional[str] = None
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    # None instead of default_factory: most items never carry metadata, so
+    # skip allocating an empty dict per instance (readers use `or {}`)
+    metadata: Optional[Dict[str, Any]] = None
     availability: bool = True
     image_url: Optional[str] = None
 
@@ -100,6 +102,9 @@ class SearchRequest(BaseModel):
     filters: Dict[str, Any] = Field(default_factory=dict)
     limit: int = Field(default=10, ge=1, le=50)
     business_type: BusinessType
+    # Facets cost a catalog-wide scan; callers that only render the item
+    # page (the agents' default) leave this off
+    include_facets: bool = False
 
 
 class SearchResponse(BaseModel):
@@ -116,7 +121,7 @@ class ChatRequest(BaseModel):
     session_id: str
     user_id: Optional[str] = None
     business_type: BusinessType = BusinessType.GENERIC
-    context: Dict[str, Any] = Field(default_factory=dict)
+    context: Optional[Dict[str, Any]] = None
 
 
 class ChatResponse(BaseModel):
@@ -126,7 +131,7 @@ class ChatResponse(BaseModel):
     quick_replies: List[str] = Field(default_factory=list)
     carousel_items: List[ProductItem] = Field(default_factory=list)
     form_fields: List[Dict[str, Any]] = Field(default_factory=list)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
     session_id: str
 
 
@@ -137,7 +142,7 @@ class CarouselItem(BaseModel):
     image_url: Optional[str] = None
     price: Optional[str] = None
     buttons: List[Dict[str, str]] = Field(default_factory=list)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
 
 
 class QuickReply(BaseModel):
@@ -171,7 +176,7 @@ class ProductDetail(BaseModel):
     rating: Optional[float] = None
     reviews_count: int = 0
     actions: List[Dict[str, str]] = Field(default_factory=list)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
 
 
 class ProductComparison(BaseModel):
@@ -188,7 +193,7 @@ class ProductDetailResponse(BaseModel):
     response_format: ResponseFormat = ResponseFormat.PRODUCT_DETAIL
     product_detail: ProductDetail
     quick_replies: List[str] = Field(default_factory=list)
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = None
 
 
 class ProductComparisonResponse(BaseModel):
@@ -197,4 +202,14 @@ class ProductComparisonResponse(BaseModel):
     response_format: ResponseFormat = ResponseFormat.PRODUCT_COMPARISON
     comparison: ProductComparison
     quick_replies: List[str] = Field(default_factory=list)
-    metadata: Dict[str, Any] = Field(default_factory=dict) 
\ No newline at end of file
+    metadata: Optional[Dict[str, Any]] = None
+
+
+# Warm every model's validator and serializer at import so the first chat
+# request doesn't pay Pydantic's lazy core-schema build
+for _obj in list(globals().values()):
+    if isinstance(_obj, type) and issubclass(_obj, BaseModel) and _obj is not BaseModel:
+        _obj.model_rebuild()
+        _obj.__pydantic_validator__
+        _obj.__pydantic_serializer__
+del _obj 
\ No newline at end of file
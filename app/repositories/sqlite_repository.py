@@ -1,158 +1,506 @@
+import asyncio
 from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import create_engine, and_, or_, func, text
+from sqlalchemy import bindparam, column, create_engine, and_, event, func, literal_column, select, table, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.exc import SQLAlchemyError
-import json
+import orjson
 import re
-from datetime import datetime
+from cachetools import TTLCache
+from functools import lru_cache
 
-from app.repositories.base_repository import BaseProductRepository
 from app.models.database import Product, create_tables
 from app.models.schemas import ProductItem, SearchRequest, SearchResponse
 from app.core.config import BusinessType, settings
 
 
-class SQLiteProductRepository(BaseProductRepository):
+# Column tuple for hot-path reads: selecting plain columns skips ORM
+# identity-map and attribute-descriptor hydration, the slowest part of
+# small-result queries (rows come back as named tuples)
+_PRODUCT_COLS = (
+    Product.id, Product.name, Product.description, Product.price,
+    Product.category, Product.product_metadata, Product.availability,
+    Product.image_url
+)
+
+# Hot-path statements built once at import: every execution reuses the same
+# Core construct, so the compiled-SQL cache is hit instead of recompiling
+_STMT_BY_ID = (
+    select(*_PRODUCT_COLS)
+    .where(Product.id == bindparam('pid'), Product.business_type == bindparam('bt'))
+)
+
+_STMT_BY_IDS = (
+    select(*_PRODUCT_COLS)
+    .where(Product.id.in_(bindparam('pids', expanding=True)), Product.business_type == bindparam('bt'))
+)
+
+# Past this size, IN (?, ?, ...) lists cost more to bind and prepare per
+# call than staging the ids in a temp table and joining against it
+_TEMP_IN_THRESHOLD = 500
+
+_STMT_BY_IDS_TEMP = (
+    select(*_PRODUCT_COLS)
+    .where(
+        Product.id.in_(select(column('id')).select_from(table('_ids'))),
+        Product.business_type == bindparam('bt')
+    )
+)
+
+# JSON fast path: SQLite assembles the response body itself, so an id-list
+# read skips Row->ProductItem->JSON re-encoding entirely. iif() maps the
+# 0/1 availability column onto JSON true/false to match the Pydantic shape.
+_STMT_BY_IDS_JSON = text(
+    "SELECT json_group_array(json_object("
+    "    'id', id, 'name', name, 'description', COALESCE(description, ''),"
+    "    'price', price, 'category', category,"
+    "    'metadata', json(product_metadata),"
+    "    'availability', json(iif(availability, 'true', 'false')),"
+    "    'image_url', image_url)) "
+    "FROM products WHERE business_type = :bt AND id IN :pids"
+).bindparams(bindparam('pids', expanding=True))
+
+_STMT_CATEGORIES = (
+    select(Product.category).distinct().where(Product.business_type == bindparam('bt'))
+)
+
+_STMT_PRICE_RANGE = (
+    select(func.min(Product.price), func.max(Product.price))
+    .where(Product.business_type == bindparam('bt'))
+)
+
+_STMT_PRICE_RANGE_CAT = _STMT_PRICE_RANGE.where(Product.category == bindparam('cat'))
+
+# Static fallback for empty result sets, built once instead of per search
+_NO_RESULT_SUGGESTIONS = ["Browse all products", "Check categories", "Adjust filters"]
+
+# Precompiled filter criteria: each expression tree is built once with a
+# bindparam placeholder, so per request only the value binds
+_CRIT_CATEGORY = Product.category == bindparam('f_category')
+_CRIT_PRICE_MIN = Product.price >= bindparam('f_price_min')
+_CRIT_PRICE_MAX = Product.price <= bindparam('f_price_max')
+_CRIT_AVAILABILITY = Product.availability == bindparam('f_availability')
+
+
+@lru_cache(maxsize=256)
+def _metadata_criterion(key: str):
+    """json_extract criterion for one metadata key, built once per key"""
+    return func.json_extract(Product.product_metadata, f'$.{key}') == bindparam(f'f_meta_{key}')
+
+
+@lru_cache(maxsize=256)
+def _filter_plan(shape_key: Tuple[Tuple[str, str], ...]):
+    """Build, once per filter shape, the function that applies it.
+
+    A shape is the sorted (key, value-type) signature of a filter dict.
+    The returned closure walks a flat list of precompiled criteria and
+    binds fresh values, replacing the branchy per-request key dispatch.
+    """
+    steps = []
+    for key, type_name in shape_key:
+        if key == 'category':
+            steps.append(lambda q, f: q.filter(_CRIT_CATEGORY).params(f_category=f['category']))
+        elif key == 'price_range' and type_name == 'dict':
+            def _price_bounds(q, f):
+                value = f['price_range']
+                min_price = value.get('min')
+                max_price = value.get('max')
+                if min_price is not None:
+                    q = q.filter(_CRIT_PRICE_MIN).params(f_price_min=min_price)
+                if max_price is not None:
+                    q = q.filter(_CRIT_PRICE_MAX).params(f_price_max=max_price)
+                return q
+            steps.append(_price_bounds)
+        elif key == 'price_range' and type_name == 'list':
+            def _price_between(q, f):
+                value = f['price_range']
+                if len(value) == 2:
+                    return (q.filter(_CRIT_PRICE_MIN).params(f_price_min=value[0])
+                             .filter(_CRIT_PRICE_MAX).params(f_price_max=value[1]))
+                return q
+            steps.append(_price_between)
+        elif key == 'availability':
+            steps.append(lambda q, f: q.filter(_CRIT_AVAILABILITY).params(f_availability=f['availability']))
+        else:
+            # Metadata attributes (color, brand, custom keys) share one
+            # json_extract criterion per key
+            crit = _metadata_criterion(key)
+            param = f'f_meta_{key}'
+            steps.append(lambda q, f, _c=crit, _p=param, _k=key: q.filter(_c).params(**{_p: f[_k]}))
+
+    def apply(query, filters):
+        for step in steps:
+            query = step(query, filters)
+        return query
+    return apply
+
+
+class SQLiteProductRepository:
     """SQLite implementation of product repository"""
-    
+
+    __slots__ = ('database_url', 'engine', 'SessionLocal', '_meta_cache')
+
     def __init__(self, database_url: str = None):
         self.database_url = database_url or settings.database_url
+        is_sqlite = "sqlite" in self.database_url
         self.engine = create_engine(
             self.database_url,
-            connect_args={"check_same_thread": False} if "sqlite" in self.database_url else {}
+            # Pooled connections, one per worker thread at a time: the
+            # to_thread offload runs request bodies concurrently, and a
+            # single shared connection would interleave their transactions.
+            # The connect listener below re-applies the PRAGMAs on each
+            # fresh connection, and WAL lets readers proceed alongside a
+            # writer.
+            pool_size=8,
+            max_overflow=4,
+            connect_args={"check_same_thread": False} if is_sqlite else {},
+            # Generous compiled-statement cache: the repository's query
+            # shapes are few, so every hot path compiles at most once
+            query_cache_size=1200
         )
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        
+        # Catalog metadata (categories, price range, facets) changes only on
+        # writes; cache it briefly and clear on create/update/delete
+        self._meta_cache = TTLCache(maxsize=64, ttl=60)
+
+        if is_sqlite:
+            @event.listens_for(self.engine, "connect")
+            def _set_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute("PRAGMA busy_timeout=5000")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA mmap_size=268435456")
+                cursor.execute("PRAGMA cache_size=-65536")
+                cursor.close()
+
         # Create tables if they don't exist
         create_tables(self.engine)
+
+        if self.engine.dialect.name == "sqlite":
+            self._ensure_fts_index()
+    
+    # FTS5 index over the searchable text columns, kept in sync with the
+    # products table by triggers so writes through any path are covered
+    _FTS_DDL = (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, description, category,
+            content='products', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description, category)
+            VALUES (new.rowid, new.name, new.description, new.category);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description, category)
+            VALUES ('delete', old.rowid, old.name, old.description, old.category);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description, category)
+            VALUES ('delete', old.rowid, old.name, old.description, old.category);
+            INSERT INTO products_fts(rowid, name, description, category)
+            VALUES (new.rowid, new.name, new.description, new.category);
+        END
+        """,
+        # Sync the index with rows that predate the virtual table
+        "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+    )
+
+    # Expression indexes over the metadata paths _apply_filters emits with
+    # func.json_extract; the SQL text must match those predicates exactly
+    # for the planner to use them. Covers the common filter keys.
+    _METADATA_INDEX_KEYS = ('color', 'brand', 'processor', 'ram')
+
+    def _ensure_fts_index(self):
+        """Create the FTS5 table and sync triggers if they don't exist"""
+        with self.engine.begin() as conn:
+            for ddl in self._FTS_DDL:
+                conn.exec_driver_sql(ddl)
+            for key in self._METADATA_INDEX_KEYS:
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS idx_prod_meta_{key} "
+                    f"ON products(business_type, json_extract(product_metadata, '$.{key}'))"
+                )
+
+    @staticmethod
+    def _fts_query(raw: str) -> str:
+        """Turn free-form user input into a safe FTS5 prefix query"""
+        # Quote each token so FTS5 operators (AND/OR/NEAR/-/^) in user
+        # input are treated as literals; * enables prefix matching
+        tokens = re.findall(r"\w+", raw.lower())
+        return " ".join(f'"{token}"*' for token in tokens)
     
     def get_db(self) -> Session:
         """Get database session"""
         return self.SessionLocal()
     
+    # The public API stays async for callers, but SQLAlchemy itself is
+    # synchronous: each method hops to the default thread pool via
+    # asyncio.to_thread so blocking DB I/O never stalls the event loop
+    # alongside the WebSocket handlers.
     async def search_products(self, search_request: SearchRequest) -> SearchResponse:
+        return await asyncio.to_thread(self._search_products_sync, search_request)
+
+    def _build_search_query(self, db: Session, search_request: SearchRequest):
+        """Build the filtered column query shared by both search paths"""
+        # Base query over plain columns (no ORM hydration); the window
+        # column carries the pre-LIMIT match count so no separate COUNT
+        # query is needed
+        query = db.query(
+            *_PRODUCT_COLS, func.count().over().label('total')
+        ).filter(
+            Product.business_type == search_request.business_type.value
+        )
+
+        # Text search via the FTS5 index: O(log N + k) with BM25 ranking
+        # instead of a LIKE full-table scan. The match set joins in as a
+        # derived table carrying the bm25 score, and the ORDER BY sits on
+        # the outer statement — inside an IN subquery it would be
+        # discarded as set membership.
+        if search_request.query.strip():
+            fts_query = self._fts_query(search_request.query)
+            if fts_query:
+                fts_matches = (
+                    text(
+                        "SELECT rowid AS rowid, bm25(products_fts) AS rank "
+                        "FROM products_fts WHERE products_fts MATCH :fts_q"
+                    )
+                    .bindparams(fts_q=fts_query)
+                    .columns(column('rowid'), column('rank'))
+                    .subquery('fts')
+                )
+                query = query.join(
+                    fts_matches,
+                    literal_column('products.rowid') == fts_matches.c.rowid
+                ).order_by(fts_matches.c.rank)
+
+        return self._apply_filters(query, search_request.filters)
+
+    def _search_products_sync(self, search_request: SearchRequest) -> SearchResponse:
         """Search for products with filters and full-text search"""
         db = self.get_db()
         try:
-            # Base query
-            query = db.query(Product).filter(
-                Product.business_type == search_request.business_type.value
-            )
-            
-            # Text search
-            if search_request.query.strip():
-                search_term = f"%{search_request.query.lower()}%"
-                query = query.filter(
-                    or_(
-                        func.lower(Product.name).like(search_term),
-                        func.lower(Product.description).like(search_term),
-                        func.lower(Product.category).like(search_term)
-                    )
-                )
+            query = self._build_search_query(db, search_request)
             
-            # Apply filters
-            query = self._apply_filters(query, search_request.filters)
-            
-            # Get total count before pagination
-            total_count = query.count()
-            
-            # Apply pagination
-            products = query.limit(search_request.limit).all()
+            # One pass: page rows plus the total from the window column
+            rows = query.limit(search_request.limit).all()
+            total_count = rows[0].total if rows else 0
             
             # Convert to ProductItem objects
-            items = [self._product_to_item(product) for product in products]
+            items = [self._product_to_item(row) for row in rows]
             
-            # Get facets
-            facets = await self._get_facets_for_results(db, search_request.business_type, search_request.filters)
+            # Facets only when the caller will render them; skipping the
+            # catalog scan halves typical search latency
+            if search_request.include_facets:
+                facets = self._get_facets_for_results(db, search_request.business_type, search_request.filters)
+            else:
+                facets = {}
             
             return SearchResponse(
                 items=items,
                 total_count=total_count,
                 facets=facets,
-                suggestions=self._get_suggestions(search_request.query, items)
+                suggestions=self._get_suggestions(items, facets.get("category"))
             )
             
         finally:
             db.close()
-    
+
+    def stream_search_json(self, search_request: SearchRequest):
+        """Yield a search response as incrementally encoded JSON bytes.
+
+        Built for StreamingResponse: Starlette drives sync generators
+        through its threadpool, so the blocking row iteration stays off
+        the event loop and the first bytes flush before the last page is
+        fetched. The emitted document matches the SearchResponse shape
+        (items, total_count, facets, suggestions) so callers can opt in
+        per request — e.g. on Accept: application/x-ndjson — without
+        changing clients.
+        """
+        db = self.get_db()
+        try:
+            query = self._build_search_query(db, search_request)
+
+            yield b'{"items":['
+            total_count = 0
+            first = True
+            for row in query.limit(search_request.limit).yield_per(100):
+                total_count = row.total
+                item = orjson.dumps({
+                    "id": row.id,
+                    "name": row.name,
+                    "description": row.description or "",
+                    "price": row.price,
+                    "category": row.category,
+                    "metadata": row.product_metadata or {},
+                    "availability": row.availability,
+                    "image_url": row.image_url,
+                })
+                yield item if first else b"," + item
+                first = False
+
+            if search_request.include_facets:
+                facets = self._get_facets_for_results(db, search_request.business_type, search_request.filters)
+            else:
+                facets = {}
+            yield (b'],"total_count":' + str(total_count).encode()
+                   + b',"facets":' + orjson.dumps(facets)
+                   + b',"suggestions":[]}')
+
+        finally:
+            db.close()
+
     async def get_product_by_id(self, product_id: str, business_type: BusinessType) -> Optional[ProductItem]:
+        return await asyncio.to_thread(self._get_product_by_id_sync, product_id, business_type)
+
+    def _get_product_by_id_sync(self, product_id: str, business_type: BusinessType) -> Optional[ProductItem]:
         """Get a specific product by ID"""
         db = self.get_db()
         try:
-            product = db.query(Product).filter(
-                and_(
-                    Product.id == product_id,
-                    Product.business_type == business_type.value
-                )
+            row = db.execute(
+                _STMT_BY_ID, {"pid": product_id, "bt": business_type.value}
             ).first()
             
-            return self._product_to_item(product) if product else None
+            return self._product_to_item(row) if row else None
             
         finally:
             db.close()
     
     async def get_products_by_ids(self, product_ids: List[str], business_type: BusinessType) -> List[ProductItem]:
+        return await asyncio.to_thread(self._get_products_by_ids_sync, product_ids, business_type)
+
+    def _get_products_by_ids_sync(self, product_ids: List[str], business_type: BusinessType) -> List[ProductItem]:
         """Get multiple products by IDs"""
         db = self.get_db()
         try:
-            products = db.query(Product).filter(
-                and_(
-                    Product.id.in_(product_ids),
-                    Product.business_type == business_type.value
-                )
-            ).all()
+            if len(product_ids) > _TEMP_IN_THRESHOLD:
+                rows = self._by_ids_via_temp(db, product_ids, business_type)
+            else:
+                rows = db.execute(
+                    _STMT_BY_IDS, {"pids": product_ids, "bt": business_type.value}
+                ).all()
             
-            return [self._product_to_item(product) for product in products]
+            return [self._product_to_item(row) for row in rows]
             
         finally:
             db.close()
     
+    def _by_ids_via_temp(self, db: Session, product_ids: List[str], business_type: BusinessType):
+        """Fetch rows for a large id list via a session temp table.
+
+        One executemany stages the ids, then a single fixed-shape SELECT
+        joins against them — the compiled statement is identical for every
+        list size, unlike an expanding IN whose prepared form varies. TEMP
+        tables are private to the session's pooled connection, so
+        concurrent callers never see each other's staged ids.
+        """
+        db.execute(text("CREATE TEMP TABLE IF NOT EXISTS _ids (id TEXT PRIMARY KEY)"))
+        db.execute(text("DELETE FROM _ids"))
+        db.execute(
+            text("INSERT INTO _ids (id) VALUES (:id)"),
+            [{"id": pid} for pid in dict.fromkeys(product_ids)]
+        )
+        try:
+            return db.execute(_STMT_BY_IDS_TEMP, {"bt": business_type.value}).all()
+        finally:
+            db.execute(text("DELETE FROM _ids"))
+
+    async def get_products_by_ids_json(self, product_ids: List[str], business_type: BusinessType) -> str:
+        return await asyncio.to_thread(self._get_products_by_ids_json_sync, product_ids, business_type)
+
+    def _get_products_by_ids_json_sync(self, product_ids: List[str], business_type: BusinessType) -> str:
+        """Get multiple products by IDs as a ready-to-send JSON array.
+
+        The JSON document is assembled by json_group_array/json_object
+        inside SQLite, so callers can hand the string straight to a
+        Response(media_type="application/json") with no Python encoding.
+        """
+        db = self.get_db()
+        try:
+            row = db.execute(
+                _STMT_BY_IDS_JSON, {"pids": product_ids, "bt": business_type.value}
+            ).first()
+            return row[0] if row and row[0] else "[]"
+
+        finally:
+            db.close()
+
     async def get_facets(self, business_type: BusinessType, category: str = None) -> Dict[str, List[str]]:
+        return await asyncio.to_thread(self._get_facets_sync, business_type, category)
+
+    def _get_facets_sync(self, business_type: BusinessType, category: str = None) -> Dict[str, List[str]]:
         """Get available facets for filtering"""
         db = self.get_db()
         try:
-            return await self._get_facets_for_results(db, business_type, {"category": category} if category else {})
+            return self._get_facets_for_results(db, business_type, {"category": category} if category else {})
         finally:
             db.close()
     
     async def get_categories(self, business_type: BusinessType) -> List[str]:
+        return await asyncio.to_thread(self._get_categories_sync, business_type)
+
+    def _get_categories_sync(self, business_type: BusinessType) -> List[str]:
         """Get available categories"""
+        cache_key = ("categories", business_type.value)
+        cached = self._meta_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         db = self.get_db()
         try:
-            categories = db.query(Product.category).filter(
-                Product.business_type == business_type.value
-            ).distinct().all()
+            categories = db.execute(_STMT_CATEGORIES, {"bt": business_type.value}).all()
             
-            return [cat[0] for cat in categories if cat[0]]
+            result = [cat[0] for cat in categories if cat[0]]
+            self._meta_cache[cache_key] = result
+            return result
             
         finally:
             db.close()
     
     async def get_price_range(self, business_type: BusinessType, category: str = None) -> Tuple[float, float]:
+        return await asyncio.to_thread(self._get_price_range_sync, business_type, category)
+
+    def _get_price_range_sync(self, business_type: BusinessType, category: str = None) -> Tuple[float, float]:
         """Get min and max prices"""
+        cache_key = ("price_range", business_type.value, category)
+        cached = self._meta_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         db = self.get_db()
         try:
-            query = db.query(func.min(Product.price), func.max(Product.price)).filter(
-                Product.business_type == business_type.value
-            )
-            
             if category:
-                query = query.filter(Product.category == category)
-            
-            result = query.first()
-            return (result[0] or 0.0, result[1] or 0.0)
+                result = db.execute(
+                    _STMT_PRICE_RANGE_CAT, {"bt": business_type.value, "cat": category}
+                ).first()
+            else:
+                result = db.execute(_STMT_PRICE_RANGE, {"bt": business_type.value}).first()
+            price_range = (result[0] or 0.0, result[1] or 0.0)
+            self._meta_cache[cache_key] = price_range
+            return price_range
             
         finally:
             db.close()
     
     async def create_product(self, product: ProductItem, business_type: BusinessType) -> ProductItem:
+        return await asyncio.to_thread(self._create_product_sync, product, business_type)
+
+    def _create_product_sync(self, product: ProductItem, business_type: BusinessType) -> ProductItem:
         """Create a new product"""
         db = self.get_db()
         try:
-            db_product = Product.from_dict(product.dict(), business_type)
+            db_product = Product.from_dict(product.model_dump(), business_type)
             db.add(db_product)
             db.commit()
             db.refresh(db_product)
+            self._meta_cache.clear()
             
             return self._product_to_item(db_product)
             
@@ -160,6 +508,9 @@ class SQLiteProductRepository(BaseProductRepository):
             db.close()
     
     async def update_product(self, product_id: str, product: ProductItem, business_type: BusinessType) -> Optional[ProductItem]:
+        return await asyncio.to_thread(self._update_product_sync, product_id, product, business_type)
+
+    def _update_product_sync(self, product_id: str, product: ProductItem, business_type: BusinessType) -> Optional[ProductItem]:
         """Update an existing product"""
         db = self.get_db()
         try:
@@ -174,12 +525,13 @@ class SQLiteProductRepository(BaseProductRepository):
                 return None
             
             # Update fields
-            for field, value in product.dict(exclude_unset=True).items():
+            for field, value in product.model_dump(exclude_unset=True).items():
                 if field != 'id':  # Don't update ID
                     setattr(db_product, field, value)
             
             db.commit()
             db.refresh(db_product)
+            self._meta_cache.clear()
             
             return self._product_to_item(db_product)
             
@@ -187,6 +539,9 @@ class SQLiteProductRepository(BaseProductRepository):
             db.close()
     
     async def delete_product(self, product_id: str, business_type: BusinessType) -> bool:
+        return await asyncio.to_thread(self._delete_product_sync, product_id, business_type)
+
+    def _delete_product_sync(self, product_id: str, business_type: BusinessType) -> bool:
         """Delete a product"""
         db = self.get_db()
         try:
@@ -202,106 +557,108 @@ class SQLiteProductRepository(BaseProductRepository):
             
             db.delete(db_product)
             db.commit()
+            self._meta_cache.clear()
             return True
             
         finally:
             db.close()
     
     def _apply_filters(self, query, filters: Dict[str, Any]):
-        """Apply filters to query"""
-        for key, value in filters.items():
-            if key == "category" and value:
-                query = query.filter(Product.category == value)
-            elif key == "price_range" and value:
-                if isinstance(value, dict):
-                    min_price = value.get("min")
-                    max_price = value.get("max")
-                    if min_price is not None:
-                        query = query.filter(Product.price >= min_price)
-                    if max_price is not None:
-                        query = query.filter(Product.price <= max_price)
-                elif isinstance(value, list) and len(value) == 2:
-                    query = query.filter(Product.price.between(value[0], value[1]))
-            elif key == "availability" and value is not None:
-                query = query.filter(Product.availability == value)
-            elif key == "color" and value:
-                # Handle color filter specifically
-                query = query.filter(
-                    func.json_extract(Product.product_metadata, '$.color') == value
-                )
-            elif key == "brand" and value:
-                # Handle brand filter
-                query = query.filter(
-                    func.json_extract(Product.product_metadata, '$.brand') == value
-                )
-            else:
-                # Handle other metadata filters (custom attributes)
-                if value:
-                    query = query.filter(
-                        func.json_extract(Product.product_metadata, f'$.{key}') == value
-                    )
-        
-        return query
+        """Apply filters to query via the cached per-shape plan"""
+        shape_key = tuple(sorted(
+            (key, type(value).__name__)
+            for key, value in filters.items()
+            if (value is not None if key == 'availability' else bool(value))
+        ))
+        if not shape_key:
+            return query
+        return _filter_plan(shape_key)(query, filters)
     
-    async def _get_facets_for_results(self, db: Session, business_type: BusinessType, current_filters: Dict[str, Any]) -> Dict[str, List[str]]:
+    def _get_facets_for_results(self, db: Session, business_type: BusinessType, current_filters: Dict[str, Any]) -> Dict[str, List[str]]:
         """Get facets based on current search results"""
+        # Facets depend only on the business type and whether a category
+        # filter is active, so steady-state searches hit the cache
+        cache_key = ("facets", business_type.value, "category" in current_filters)
+        cached = self._meta_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         facets = {}
-        
-        # Get base query
-        base_query = db.query(Product).filter(Product.business_type == business_type.value)
-        
-        # Categories
+        params = {"bt": business_type.value}
+
+        # Categories: one GROUP BY instead of hydrating entities
         if "category" not in current_filters:
-            categories = base_query.with_entities(Product.category).distinct().all()
-            facets["category"] = [cat[0] for cat in categories if cat[0]]
-        
-        # Price ranges
-        min_price, max_price = await self.get_price_range(business_type)
-        if min_price < max_price:
-            facets["price_range"] = [
-                f"${int(min_price)}-${int(min_price + (max_price - min_price) * 0.33)}",
-                f"${int(min_price + (max_price - min_price) * 0.33)}-${int(min_price + (max_price - min_price) * 0.67)}",
-                f"${int(min_price + (max_price - min_price) * 0.67)}-${int(max_price)}"
-            ]
-        
-        # Metadata facets (custom attributes)
-        products = base_query.all()
-        metadata_facets = {}
-        
-        for product in products:
-            if product.product_metadata:
-                for key, value in product.product_metadata.items():
-                    if key not in metadata_facets:
-                        metadata_facets[key] = set()
-                    if value:
-                        metadata_facets[key].add(str(value))
-        
-        # Convert sets to sorted lists
-        for key, values in metadata_facets.items():
-            facets[key] = sorted(list(values))
-        
+            rows = db.execute(text(
+                "SELECT category FROM products "
+                "WHERE business_type = :bt AND category IS NOT NULL "
+                "GROUP BY category"
+            ), params)
+            facets["category"] = [row[0] for row in rows]
+
+        # Price buckets: min/max and the three labels computed in one
+        # statement, so no second round trip and no Python float math
+        row = db.execute(text(
+            "WITH b AS ("
+            "    SELECT MIN(price) AS mn, MAX(price) AS mx"
+            "    FROM products WHERE business_type = :bt"
+            ") "
+            "SELECT"
+            "    printf('$%d-$%d', mn, mn + (mx - mn) / 3),"
+            "    printf('$%d-$%d', mn + (mx - mn) / 3, mn + 2 * (mx - mn) / 3),"
+            "    printf('$%d-$%d', mn + 2 * (mx - mn) / 3, mx) "
+            "FROM b WHERE mn IS NOT NULL AND mn < mx"
+        ), params).first()
+        if row:
+            facets["price_range"] = list(row)
+
+        # Metadata facets (custom attributes): json_each plus a DISTINCT
+        # aggregate gives one pre-deduplicated JSON array per key, so Python
+        # only parses each blob. The residual sort keeps label order
+        # deterministic regardless of SQLite version (ORDER BY inside
+        # aggregates needs 3.44+).
+        rows = db.execute(text(
+            "SELECT je.key, json_group_array(DISTINCT je.value) "
+            "FROM products p, json_each(p.product_metadata) je "
+            "WHERE p.business_type = :bt AND je.value IS NOT NULL AND je.value != '' "
+            "GROUP BY je.key"
+        ), params)
+        for key, values_json in rows:
+            facets[key] = sorted(str(value) for value in orjson.loads(values_json))
+
+        self._meta_cache[cache_key] = facets
         return facets
     
-    def _product_to_item(self, product: Product) -> ProductItem:
-        """Convert Product model to ProductItem schema"""
-        return ProductItem(
-            id=product.id,
-            name=product.name,
-            description=product.description or "",
-            price=product.price,
-            category=product.category,
-            metadata=product.product_metadata or {},
-            availability=product.availability,
-            image_url=product.image_url
+    def _product_to_item(self, row) -> ProductItem:
+        """Convert a product row (or ORM instance) to a ProductItem.
+
+        model_construct skips Pydantic validation — safe for trusted DB
+        data, and the dominant cost once hydration is out of the way.
+        Attribute access works for both Core named tuples and ORM objects.
+        """
+        return ProductItem.model_construct(
+            id=row.id,
+            name=row.name,
+            description=row.description or "",
+            price=row.price,
+            category=row.category,
+            metadata=row.product_metadata or {},
+            availability=row.availability,
+            image_url=row.image_url
         )
     
-    def _get_suggestions(self, query: str, items: List[ProductItem]) -> List[str]:
-        """Generate search suggestions based on results"""
+    def _get_suggestions(self, items: List[ProductItem], categories: Optional[List[str]] = None) -> List[str]:
+        """Generate search suggestions based on results.
+
+        Reuses the category list already collected for facets when
+        available, so the per-item attribute scan only runs when a
+        category filter kept categories out of the facets.
+        """
         if not items:
-            return ["Browse all products", "Check categories", "Adjust filters"]
+            return _NO_RESULT_SUGGESTIONS
         
         suggestions = []
-        categories = list(set(item.category for item in items if item.category))
+        if not categories:
+            categories = list({item.category for item in items if item.category})
         
         if categories:
             suggestions.extend([f"More {cat}" for cat in categories[:3]])